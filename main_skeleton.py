@@ -1,49 +1,194 @@
 import sys
 import base64
-import io
+import functools
 import numpy as np
+import numexpr as ne
 import librosa
-from PIL import Image
+import soundfile as sf
+from numba import njit
+
+# 可选的 Rust 后端 (realfft/FFTW, 可复用 FFT plan)，比 librosa 的 STFT+matmul 快很多
+try:
+    import spectrograms as sg
+except ImportError:
+    sg = None
+
+# 可选的 GPU 路径：STFT 和 mel 滤波矩阵乘放到 CUDA 上，只拷回最终的 dB 矩阵
+try:
+    import cupy as cp
+    import cupyx.scipy.signal as cps
+except ImportError:
+    cp = None
+
+# 骨架可视化用 96 个 mel 频带就足够（脊线像素数几乎不变），
+# 浏览器端细化循环每次迭代少处理约 25% 的像素
+N_MELS_DISPLAY = 96
+
+# 细化迭代上限，预计算内核和页面 JS 内核共用：两边必须一致，
+# 否则默认参数下预计算骨架和页面重算的结果会不同
+_ZS_MAX_ITERS = 100
+
+@njit(cache=True)
+def _zs_thin(b):
+    """Zhang-Suen 细化（原地迭代，上限 _ZS_MAX_ITERS 次）。与页面里的 JS 内核
+    是同一算法、同一迭代上限，用于在生成 HTML 时预先算好默认参数下的骨架。"""
+    h, w = b.shape
+    for _ in range(_ZS_MAX_ITERS):
+        changed = False
+        for step in range(2):
+            src = b.copy()
+            for y in range(1, h - 1):
+                for x in range(1, w - 1):
+                    if src[y, x] != 1:
+                        continue
+                    p2 = src[y-1, x]
+                    p3 = src[y-1, x+1]
+                    p4 = src[y, x+1]
+                    p5 = src[y+1, x+1]
+                    p6 = src[y+1, x]
+                    p7 = src[y+1, x-1]
+                    p8 = src[y, x-1]
+                    p9 = src[y-1, x-1]
+
+                    A = ((p2 == 0 and p3 == 1) + (p3 == 0 and p4 == 1) +
+                         (p4 == 0 and p5 == 1) + (p5 == 0 and p6 == 1) +
+                         (p6 == 0 and p7 == 1) + (p7 == 0 and p8 == 1) +
+                         (p8 == 0 and p9 == 1) + (p9 == 0 and p2 == 1))
+
+                    B = p2 + p3 + p4 + p5 + p6 + p7 + p8 + p9
+
+                    if step == 0:
+                        m1 = p2 * p4 * p6
+                        m2 = p4 * p6 * p8
+                    else:
+                        m1 = p2 * p4 * p8
+                        m2 = p2 * p6 * p8
+
+                    if A == 1 and 2 <= B <= 6 and m1 == 0 and m2 == 0:
+                        b[y, x] = 0
+                        changed = True
+        if not changed:
+            break
+    return b
+
+def _zs_luts():
+    """枚举全部 256 种 3x3 邻域位模式，预先算好 Zhang-Suen 两个子迭代的删除判定。
+    位序与 JS 内核一致: n = p9 | p2<<1 | p3<<2 | p4<<3 | p5<<4 | p6<<5 | p7<<6 | p8<<7
+    """
+    lut1 = bytearray(256)
+    lut2 = bytearray(256)
+    for n in range(256):
+        p9 = n & 1
+        p2 = (n >> 1) & 1
+        p3 = (n >> 2) & 1
+        p4 = (n >> 3) & 1
+        p5 = (n >> 4) & 1
+        p6 = (n >> 5) & 1
+        p7 = (n >> 6) & 1
+        p8 = (n >> 7) & 1
+        ring = (p2, p3, p4, p5, p6, p7, p8, p9, p2)
+        A = sum(1 for a, b in zip(ring, ring[1:]) if a == 0 and b == 1)
+        B = p2 + p3 + p4 + p5 + p6 + p7 + p8 + p9
+        base = A == 1 and 2 <= B <= 6
+        lut1[n] = 1 if base and p2 * p4 * p6 == 0 and p4 * p6 * p8 == 0 else 0
+        lut2[n] = 1 if base and p2 * p4 * p8 == 0 and p2 * p6 * p8 == 0 else 0
+    return lut1, lut2
+
+@functools.lru_cache(maxsize=8)
+def _mel_fb(sr, n_fft, n_mels, fmax=None):
+    """Mel 滤波器组，按参数缓存：批量处理多个文件时不必每个文件重建一次。"""
+    return librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels, fmax=fmax)
 
 def process_audio_to_html(audio_path, output_html="mel_skeleton.html"):
     print(f"Loading audio: {audio_path}...")
     
     # 1. 音频处理与 Mel 谱图计算
+    # soundfile 是 libsndfile 的薄封装，比 librosa.load 的 audioread 链路快得多
     try:
-        y, sr = librosa.load(audio_path, sr=None)
+        y, sr = sf.read(audio_path, dtype='float32', always_2d=False)
     except Exception as e:
         print(f"Error loading audio: {e}")
         sys.exit(1)
+    if y.ndim > 1:
+        y = y.mean(axis=1)
 
     # 计算 Mel Spectrogram
     n_fft = 2048
     hop_length = 512
-    n_mels = 128
-    S = librosa.feature.melspectrogram(y=y, sr=sr, n_fft=n_fft, hop_length=hop_length, n_mels=n_mels)
-    
-    # 转为对数刻度 (dB)
-    S_dB = librosa.power_to_db(S, ref=np.max)
+    n_mels = N_MELS_DISPLAY
+    if sg is not None:
+        # Rust 后端直接输出 dB 刻度的 Mel 谱
+        stft_params = sg.StftParams(n_fft=n_fft, hop_size=hop_length, window=sg.WindowType.hanning())
+        spec_params = sg.SpectrogramParams(stft_params, sample_rate=sr)
+        mel_params = sg.MelParams(n_mels=n_mels, f_min=0.0, f_max=8000.0)
+        db_params = sg.LogParams(floor_db=-80.0)
+        S_dB = sg.compute_mel_db_spectrogram(y, spec_params, mel_params, db_params).data
+    elif cp is not None:
+        # FFT 沿帧方向完全并行，mel 投影是一个 GEMM —— 都是 GPU 擅长的
+        y_g = cp.asarray(y)
+        stft = cps.stft(y_g, nperseg=n_fft, noverlap=n_fft - hop_length)[2]
+        P = cp.abs(stft) ** 2
+        mel_fb = cp.asarray(_mel_fb(sr, n_fft, n_mels))
+        S_g = mel_fb @ P
+        S_dB_g = 10.0 * cp.log10(cp.maximum(S_g, 1e-10))
+        S_dB_g -= S_dB_g.max()  # 等价于 power_to_db(ref=np.max)
+        S_dB = cp.asnumpy(S_dB_g)
+    else:
+        # 显式 STFT (scipy 后端) + 缓存的滤波器组，不走 melspectrogram 的每次重建
+        D = librosa.stft(y, n_fft=n_fft, hop_length=hop_length)
+        S = np.dot(_mel_fb(sr, n_fft, n_mels), np.abs(D) ** 2)
+
+        # 转为对数刻度 (dB)
+        S_dB = librosa.power_to_db(S, ref=np.max)
 
     # 2. 图像预处理 (归一化到 0-255)
     # 翻转 Y 轴，因为 spectrogram 默认低频在下，但在图像矩阵中索引 0 在上
     S_dB = np.flipud(S_dB)
     
-    img_min = S_dB.min()
-    img_max = S_dB.max()
-    norm_S = (S_dB - img_min) / (img_max - img_min) * 255.0
-    img_data = norm_S.astype(np.uint8)
+    # numexpr 把减法/乘法融合为对 128xN 矩阵的单次遍历（该步是内存带宽瓶颈）
+    mn, mx = S_dB.min(), S_dB.max()
+    img_data = ne.evaluate("(S_dB - mn) * (255.0 / (mx - mn))").astype(np.uint8)
 
-    # 3. 将图像转换为 Base64 字符串
-    img = Image.fromarray(img_data, mode='L') # L mode is grayscale
     # 调整一下大小，避免太长导致浏览器处理太慢，限制最大宽度
     max_width = 1200
-    if img.width > max_width:
-        new_height = int(img.height * (max_width / img.width))
-        img = img.resize((max_width, new_height), Image.Resampling.BILINEAR)
+    if img_data.shape[1] > max_width:
+        # 整数因子的均值池化：一次向量化 reshape/mean 沿时间轴降采样，
+        # 既有抗混叠效果又远快于 PIL 的 BILINEAR
+        h, w = img_data.shape
+        k = -(-w // max_width)  # ceil，保证结果宽度 <= max_width
+        img_data = img_data[:, :w - w % k].reshape(h, -1, k).mean(axis=2).astype(np.uint8)
+
+    # 3. 直接内嵌原始灰度像素：跳过 zlib/PNG 编码，浏览器端也免去 PNG 解码，
+    # JS 直接从字节构造 ImageData
+    img_h, img_w = img_data.shape
+    raw_base64 = base64.b64encode(img_data.tobytes()).decode('utf-8')
 
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    # 3.5 用 Numba 预先算好默认滑条参数下的骨架并一并内嵌：
+    # 页面加载时直接显示，不必先跑一遍 JS 细化；滑条改动时才走浏览器内核
+    default_thresh = 80
+    default_bias = 2
+    binary = (img_data > default_thresh).astype(np.uint8)
+    if default_bias > 0:
+        dil = binary.copy()
+        for k in range(1, default_bias + 1):
+            dil[:, :-k] |= binary[:, k:]
+            dil[:, k:] |= binary[:, :-k]
+        binary = dil
+    skel = _zs_thin(binary)
+    skel_base64 = base64.b64encode((skel * 255).tobytes()).decode('utf-8')
+
+    # 3.6 预先按 8 个阈值二值化并按位打包 (1 bit/像素)：
+    # 滑条改动时 JS 只解包最近的平面，不再逐像素对灰度字节做阈值比较
+    thresholds = np.arange(48, 176, 16, dtype=np.uint8)  # 48..160，含默认值 80
+    planes = img_data[None, :, :] > thresholds[:, None, None]
+    planes_packed = np.packbits(planes, axis=-1)  # (8, h, ceil(w/8))
+    planes_base64 = base64.b64encode(planes_packed.tobytes()).decode('utf-8')
+    plane_thresholds = ','.join(map(str, thresholds.tolist()))
+
+    # Zhang-Suen 删除判定查找表，直接内联进 JS
+    lut1, lut2 = _zs_luts()
+    zs_lut1 = ','.join(map(str, lut1))
+    zs_lut2 = ','.join(map(str, lut2))
 
     # 4. 生成 HTML
     # 这里包含了完整的 CSS 和 JS (Zhang-Suen 算法实现)
@@ -74,9 +219,6 @@ def process_audio_to_html(audio_path, output_html="mel_skeleton.html"):
         .panel {{ flex: 1; }}
         .panel h3 {{ font-size: 1rem; color: #888; margin: 5px 0; }}
         
-        /* 隐藏原始图片，仅用于加载数据 */
-        #sourceImg {{ display: none; }}
-        
         .status {{ color: #ff9800; font-size: 0.8em; margin-left: 10px; }}
     </style>
 </head>
@@ -110,10 +252,106 @@ def process_audio_to_html(audio_path, output_html="mel_skeleton.html"):
         </div>
     </div>
 
-    <img id="sourceImg" src="data:image/png;base64,{img_base64}" onload="init()" />
-
 <script>
-    const img = document.getElementById('sourceImg');
+    // 原始灰度像素（无 PNG 封装），W/H 为图像尺寸
+    const W = {img_w}, H = {img_h};
+    const raw = Uint8Array.from(atob("{raw_base64}"), c => c.charCodeAt(0));
+    // 服务端预计算的骨架（默认滑条参数，0/255 灰度）
+    const skel = Uint8Array.from(atob("{skel_base64}"), c => c.charCodeAt(0));
+
+    // Zhang-Suen 删除判定：8 邻域位模式 -> 0/1，Python 端枚举好 256 项直接内联
+    const LUT1 = new Uint8Array([{zs_lut1}]);
+    const LUT2 = new Uint8Array([{zs_lut2}]);
+
+    // Python 端预二值化好的位打包平面，每个阈值一个 (np.packbits，MSB 在前)
+    const PLANE_T = [{plane_thresholds}];
+    const planeBytesPerRow = Math.ceil(W / 8);
+    const planeSize = planeBytesPerRow * H;
+    const planes = Uint8Array.from(atob("{planes_base64}"), c => c.charCodeAt(0));
+
+    // 把最接近 threshold 的平面解包成字节图，返回实际使用的阈值
+    function unpackPlane(threshold, out) {{
+        let best = 0;
+        for (let i = 1; i < PLANE_T.length; i++) {{
+            if (Math.abs(PLANE_T[i] - threshold) < Math.abs(PLANE_T[best] - threshold)) best = i;
+        }}
+        const base = best * planeSize;
+        for (let y = 0; y < H; y++) {{
+            const rowOff = y * W, byteOff = base + y * planeBytesPerRow;
+            for (let x = 0; x < W; x++) {{
+                out[rowOff + x] = (planes[byteOff + (x >> 3)] >> (7 - (x & 7))) & 1;
+            }}
+        }}
+        return PLANE_T[best];
+    }}
+
+    // 多核路径：Zhang-Suen 子迭代内各行互不依赖（只读 src 写 dst），可以按行区间
+    // 切给 Worker 池。需要 SharedArrayBuffer，而它要求 crossOriginIsolated ——
+    // 直接 file:// 打开时不满足，此时回退单线程内核。
+    const PARALLEL = typeof SharedArrayBuffer !== 'undefined' && window.crossOriginIsolated;
+    let pool = null;
+
+    function makePool() {{
+        const workerSrc = `
+            let lut1, lut2;
+            onmessage = (e) => {{
+                const m = e.data;
+                if (m.type === 'init') {{ lut1 = m.lut1; lut2 = m.lut2; return; }}
+                const src = new Uint8Array(m.src), dst = new Uint8Array(m.dst);
+                const lut = m.step === 1 ? lut1 : lut2;
+                const w = m.w;
+                let changed = 0;
+                for (let y = m.y0; y < m.y1; y++) {{
+                    for (let x = 1; x < w - 1; x++) {{
+                        const idx = y*w + x;
+                        if (src[idx] !== 1) continue;
+                        const n = src[(y-1)*w + x-1]
+                                | (src[(y-1)*w + x]   << 1)
+                                | (src[(y-1)*w + x+1] << 2)
+                                | (src[idx+1]         << 3)
+                                | (src[(y+1)*w + x+1] << 4)
+                                | (src[(y+1)*w + x]   << 5)
+                                | (src[(y+1)*w + x-1] << 6)
+                                | (src[idx-1]         << 7);
+                        if (lut[n]) {{ dst[idx] = 0; changed = 1; }}
+                    }}
+                }}
+                postMessage(changed);
+            }};`;
+        const url = URL.createObjectURL(new Blob([workerSrc], {{ type: 'application/javascript' }}));
+        const n = Math.max(1, (navigator.hardwareConcurrency || 2) - 1);
+        const workers = [];
+        for (let i = 0; i < n; i++) {{
+            const wk = new Worker(url);
+            wk.postMessage({{ type: 'init', lut1: LUT1, lut2: LUT2 }});
+            workers.push(wk);
+        }}
+        return workers;
+    }}
+
+    function runWorker(wk, msg) {{
+        return new Promise(resolve => {{
+            wk.onmessage = (e) => resolve(e.data);
+            wk.postMessage(msg);
+        }});
+    }}
+
+    // 与 zsStep1/zsStep2 等价的并行版：行区间切给各个 Worker，主线程归并 changed 标志
+    async function zsStepParallel(step, src, dst, w, h) {{
+        dst.set(src);
+        const n = pool.length;
+        const chunk = Math.ceil((h - 2) / n);
+        const jobs = [];
+        for (let i = 0; i < n; i++) {{
+            const y0 = 1 + i * chunk;
+            if (y0 >= h - 1) break;
+            const y1 = Math.min(h - 1, y0 + chunk);
+            jobs.push(runWorker(pool[i], {{ step: step, src: src.buffer, dst: dst.buffer, w: w, y0: y0, y1: y1 }}));
+        }}
+        const flags = await Promise.all(jobs);
+        return flags.some(f => f) ? 1 : 0;
+    }}
+
     const cOrg = document.getElementById('canvasOrg');
     const ctxOrg = cOrg.getContext('2d');
     const cRes = document.getElementById('canvasRes');
@@ -138,132 +376,209 @@ def process_audio_to_html(audio_path, output_html="mel_skeleton.html"):
 
     function init() {{
         // 设置 Canvas 大小
-        cOrg.width = img.width;
-        cOrg.height = img.height;
-        cRes.width = img.width;
-        cRes.height = img.height;
+        cOrg.width = W;
+        cOrg.height = H;
+        cRes.width = W;
+        cRes.height = H;
 
-        // 绘制原始图
-        ctxOrg.drawImage(img, 0, 0);
-        
-        // 首次运行
-        runProcessing();
+        // 灰度字节直接展开成 RGBA 绘制原始图
+        const orgImg = ctxOrg.createImageData(W, H);
+        const d = orgImg.data;
+        for (let i = 0; i < W * H; i++) {{
+            const v = raw[i];
+            d[i*4] = v; d[i*4+1] = v; d[i*4+2] = v; d[i*4+3] = 255;
+        }}
+        ctxOrg.putImageData(orgImg, 0, 0);
+
+        // 首次显示预计算骨架，零计算；之后滑条改动才触发 runProcessing
+        const resImg = ctxRes.createImageData(W, H);
+        const rd = resImg.data;
+        for (let i = 0; i < W * H; i++) {{
+            rd[i*4 + 1] = skel[i]; // 绿色显示骨架
+            rd[i*4 + 3] = 255;
+        }}
+        ctxRes.putImageData(resImg, 0, 0);
+        statusSpan.innerText = "Done (precomputed)";
     }}
 
-    function runProcessing() {{
-        const width = cOrg.width;
-        const height = cOrg.height;
-        
-        // 1. 获取原始像素
-        const frame = ctxOrg.getImageData(0, 0, width, height);
-        const data = frame.data; // RGBA array
-        
+    // van Herk / Gil-Werman 横向膨胀：行分成长 2*hBias+1 的段，
+    // 段内做前缀 OR (g) 和后缀 OR (hseg)，每个输出像素只要两次 OR，
+    // 代价与 hBias 无关。两端补零处理边界。
+    function dilateRowH(row, hBias, out) {{
+        const w = row.length;
+        const L = 2 * hBias + 1;
+        const padW = Math.ceil((w + 2 * hBias) / L) * L;
+        const buf = new Uint8Array(padW);
+        buf.set(row, hBias);
+        const g = new Uint8Array(padW);
+        const hseg = new Uint8Array(padW);
+        for (let s = 0; s < padW; s += L) {{
+            g[s] = buf[s];
+            for (let i = s + 1; i < s + L; i++) g[i] = g[i-1] | buf[i];
+            const e = s + L - 1;
+            hseg[e] = buf[e];
+            for (let i = e - 1; i >= s; i--) hseg[i] = hseg[i+1] | buf[i];
+        }}
+        for (let i = 0; i < w; i++) {{
+            // buf 坐标下窗口为 [i, i + 2*hBias]，恰好跨到相邻段
+            out[i] = hseg[i] | g[i + 2 * hBias];
+        }}
+    }}
+
+    // Zhang-Suen 子迭代（全图扫描版）：按传入的 LUT 把 src 擦写到 dst，
+    // 返回 changed 标志，并把本次删除的像素索引收集进 removed，
+    // 作为后续子迭代的脏区种子。
+    function zsStepScan(lut, src, dst, w, h, removed) {{
+        dst.set(src);
+        let changed = 0;
+        for (let y = 1; y < h - 1; y++) {{
+            for (let x = 1; x < w - 1; x++) {{
+                const idx = y*w + x;
+                if (src[idx] !== 1) continue;
+                const n = src[(y-1)*w + x-1]
+                        | (src[(y-1)*w + x]   << 1)
+                        | (src[(y-1)*w + x+1] << 2)
+                        | (src[idx+1]         << 3)
+                        | (src[(y+1)*w + x+1] << 4)
+                        | (src[(y+1)*w + x]   << 5)
+                        | (src[(y+1)*w + x-1] << 6)
+                        | (src[idx-1]         << 7);
+                if (lut[n]) {{
+                    dst[idx] = 0;
+                    removed.push(idx);
+                    changed = 1;
+                }}
+            }}
+        }}
+        return changed;
+    }}
+
+    // 脏区版：前两个子迭代都全图扫过之后，谓词结果可能变化的只有最近两个
+    // 子迭代删除像素的 8 邻域。只重扫这些候选；seen/seenGen 按代号去重。
+    let seen = null, seenGen = 0;
+
+    function zsStepFrontier(lut, src, dst, w, h, frontA, frontB, removed) {{
+        dst.set(src);
+        let changed = 0;
+        seenGen++;
+        for (let list = 0; list < 2; list++) {{
+            const front = list === 0 ? frontA : frontB;
+            for (let i = 0; i < front.length; i++) {{
+                const f = front[i];
+                const fy = (f / w) | 0, fx = f - fy * w;
+                for (let y = Math.max(1, fy - 1); y <= Math.min(h - 2, fy + 1); y++) {{
+                    for (let x = Math.max(1, fx - 1); x <= Math.min(w - 2, fx + 1); x++) {{
+                        const idx = y*w + x;
+                        if (seen[idx] === seenGen) continue;
+                        seen[idx] = seenGen;
+                        if (src[idx] !== 1) continue;
+                        const n = src[(y-1)*w + x-1]
+                                | (src[(y-1)*w + x]   << 1)
+                                | (src[(y-1)*w + x+1] << 2)
+                                | (src[idx+1]         << 3)
+                                | (src[(y+1)*w + x+1] << 4)
+                                | (src[(y+1)*w + x]   << 5)
+                                | (src[(y+1)*w + x-1] << 6)
+                                | (src[idx-1]         << 7);
+                        if (lut[n]) {{
+                            dst[idx] = 0;
+                            removed.push(idx);
+                            changed = 1;
+                        }}
+                    }}
+                }}
+            }}
+        }}
+        return changed;
+    }}
+
+    // 并行路径是异步的：滑块 change 的 setTimeout 或 Update 双击可能在上一轮
+    // await 期间再次触发，两轮会往同一批 Worker postMessage 并互相改写
+    // onmessage，应答就可能 resolve 到另一轮的 promise。busy 标志挡掉重入，
+    // 只记一个"待重跑"，当前轮收尾后按最新滑块值补跑一次
+    let busy = false, rerun = false;
+    async function runProcessing() {{
+        if (busy) {{ rerun = true; return; }}
+        busy = true;
+        try {{
+            do {{
+                rerun = false;
+                await doProcessing();
+            }} while (rerun);
+        }} finally {{
+            busy = false;
+        }}
+    }}
+
+    async function doProcessing() {{
+        const width = W;
+        const height = H;
+
         const threshold = parseInt(sliderThresh.value);
         const hBias = parseInt(sliderBias.value);
 
-        // 创建二值化矩阵 (0 or 1)
-        // 我们使用一个平坦的数组来模拟二维矩阵，binaryMap[y * width + x]
-        let binaryMap = new Uint8Array(width * height);
+        // 并行路径下缓冲区要放在 SharedArrayBuffer 里才能被 Worker 共享
+        const mkBuf = PARALLEL
+            ? (n) => new Uint8Array(new SharedArrayBuffer(n))
+            : (n) => new Uint8Array(n);
 
-        for (let i = 0; i < data.length; i += 4) {{
-            // 灰度值 (我们是灰度图，R=G=B)
-            let val = data[i]; 
-            binaryMap[i/4] = (val > threshold) ? 1 : 0;
-        }}
+        // 创建二值化矩阵 (0 or 1)：滑条值吸附到最近的预打包平面，
+        // 解包是顺序的 8 像素/字节展开，替代全图逐像素比较
+        let binaryMap = mkBuf(width * height);
+        const effThresh = unpackPlane(threshold, binaryMap);
 
         // 2. 预处理：横向增强 (Horizontal Morphological Dilation/Closing)
         // 为了连接那些因为能量波动断开的横向线条
         if (hBias > 0) {{
-            let enhancedMap = new Uint8Array(width * height);
+            const out = new Uint8Array(width);
             for (let y = 0; y < height; y++) {{
-                for (let x = 0; x < width; x++) {{
-                    if (binaryMap[y * width + x] === 1) {{
-                        // 如果当前点是白点，向左右扩散 hBias 个像素
-                        for (let k = -hBias; k <= hBias; k++) {{
-                            let nx = x + k;
-                            if (nx >= 0 && nx < width) {{
-                                enhancedMap[y * width + nx] = 1;
-                            }}
-                        }}
-                    }}
-                }}
+                const row = binaryMap.subarray(y * width, (y + 1) * width);
+                dilateRowH(row, hBias, out);
+                row.set(out);
             }}
-            binaryMap = enhancedMap;
         }}
 
         // 3. 核心算法：Zhang-Suen Thinning (Skeletonization)
         // 这是一个迭代算法，直到图像不再改变
         let pixelsRemoved = true;
         let iterCount = 0;
-        const maxIters = 100; // 防止死循环
+        const maxIters = {_ZS_MAX_ITERS}; // 防止死循环；与 Python 预计算内核同上限
+
+        // 双缓冲：删除决策直接写入 nextMap，免去 markers 数组的分配和二次遍历
+        let nextMap = mkBuf(width * height);
+
+        if (PARALLEL && !pool) pool = makePool();
+        if (!PARALLEL && (!seen || seen.length !== width * height)) {{
+            seen = new Int32Array(width * height);
+            seenGen = 0;
+        }}
+
+        // remPrev1/remPrev2: 最近两个子迭代删除的像素索引；都有了之后才走脏区路径
+        let remPrev1 = null, remPrev2 = null;
+        const subStep = (lut) => {{
+            const out = [];
+            const r = (remPrev2 === null)
+                ? zsStepScan(lut, binaryMap, nextMap, width, height, out)
+                : zsStepFrontier(lut, binaryMap, nextMap, width, height, remPrev1, remPrev2, out);
+            [binaryMap, nextMap] = [nextMap, binaryMap];
+            remPrev2 = remPrev1;
+            remPrev1 = out;
+            return r;
+        }};
 
         while (pixelsRemoved && iterCount < maxIters) {{
-            pixelsRemoved = false;
             iterCount++;
-            
-            // Step 1
-            let markers = [];
-            for (let y = 1; y < height - 1; y++) {{
-                for (let x = 1; x < width - 1; x++) {{
-                    let p2 = binaryMap[(y-1)*width + x];
-                    let p3 = binaryMap[(y-1)*width + x+1];
-                    let p4 = binaryMap[y*width + x+1];
-                    let p5 = binaryMap[(y+1)*width + x+1];
-                    let p6 = binaryMap[(y+1)*width + x];
-                    let p7 = binaryMap[(y+1)*width + x-1];
-                    let p8 = binaryMap[y*width + x-1];
-                    let p9 = binaryMap[(y-1)*width + x-1];
-
-                    let A  = (p2 == 0 && p3 == 1) + (p3 == 0 && p4 == 1) + 
-                             (p4 == 0 && p5 == 1) + (p5 == 0 && p6 == 1) + 
-                             (p6 == 0 && p7 == 1) + (p7 == 0 && p8 == 1) +
-                             (p8 == 0 && p9 == 1) + (p9 == 0 && p2 == 1);
-                    
-                    let B  = p2 + p3 + p4 + p5 + p6 + p7 + p8 + p9;
-                    
-                    let m1 = p2 * p4 * p6;
-                    let m2 = p4 * p6 * p8;
-
-                    if (binaryMap[y*width+x] === 1 && A === 1 && (B >= 2 && B <= 6) && m1 === 0 && m2 === 0) {{
-                        markers.push(y*width+x);
-                    }}
-                }}
+            let changed;
+            if (PARALLEL) {{
+                changed = await zsStepParallel(1, binaryMap, nextMap, width, height);
+                [binaryMap, nextMap] = [nextMap, binaryMap];
+                changed |= await zsStepParallel(2, binaryMap, nextMap, width, height);
+                [binaryMap, nextMap] = [nextMap, binaryMap];
+            }} else {{
+                changed = subStep(LUT1);
+                changed |= subStep(LUT2);
             }}
-            
-            if (markers.length > 0) pixelsRemoved = true;
-            for (let i = 0; i < markers.length; i++) binaryMap[markers[i]] = 0;
-
-            // Step 2
-            markers = [];
-            for (let y = 1; y < height - 1; y++) {{
-                for (let x = 1; x < width - 1; x++) {{
-                    let p2 = binaryMap[(y-1)*width + x];
-                    let p3 = binaryMap[(y-1)*width + x+1];
-                    let p4 = binaryMap[y*width + x+1];
-                    let p5 = binaryMap[(y+1)*width + x+1];
-                    let p6 = binaryMap[(y+1)*width + x];
-                    let p7 = binaryMap[(y+1)*width + x-1];
-                    let p8 = binaryMap[y*width + x-1];
-                    let p9 = binaryMap[(y-1)*width + x-1];
-
-                    let A  = (p2 == 0 && p3 == 1) + (p3 == 0 && p4 == 1) + 
-                             (p4 == 0 && p5 == 1) + (p5 == 0 && p6 == 1) + 
-                             (p6 == 0 && p7 == 1) + (p7 == 0 && p8 == 1) +
-                             (p8 == 0 && p9 == 1) + (p9 == 0 && p2 == 1);
-                    
-                    let B  = p2 + p3 + p4 + p5 + p6 + p7 + p8 + p9;
-                    
-                    let m1 = p2 * p4 * p8;
-                    let m2 = p2 * p6 * p8;
-
-                    if (binaryMap[y*width+x] === 1 && A === 1 && (B >= 2 && B <= 6) && m1 === 0 && m2 === 0) {{
-                        markers.push(y*width+x);
-                    }}
-                }}
-            }}
-
-            if (markers.length > 0) pixelsRemoved = true;
-            for (let i = 0; i < markers.length; i++) binaryMap[markers[i]] = 0;
+            pixelsRemoved = changed !== 0;
         }}
 
         // 4. 将结果绘制回 Canvas
@@ -281,8 +596,10 @@ def process_audio_to_html(audio_path, output_html="mel_skeleton.html"):
         }}
         
         ctxRes.putImageData(outputImg, 0, 0);
-        statusSpan.innerText = "Done (Iterations: " + iterCount + ")";
+        statusSpan.innerText = "Done (Iterations: " + iterCount + ", Threshold: " + effThresh + ")";
     }}
+
+    init();
 </script>
 </body>
 </html>